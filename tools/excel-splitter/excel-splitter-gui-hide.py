@@ -1,81 +1,118 @@
-import sys
 import os
-import shutil
-import glob
-import platform
 import threading
-import subprocess
-from datetime import datetime
+import queue
 
 # --- CONFIGURATION ---
 LOG_ROOT_DIR = os.path.join(os.getcwd(), "logs") 
+MAX_OPENPYXL_WORKERS = min(4, os.cpu_count() or 1)
 
 # GUI Imports
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
-# Logic Imports
+# 兩個分檔工具共用的檔案 / Excel COM / Tk 輔助 (同資料夾的 splitter_common.py)
+from splitter_common import (
+    MISSING_DEPENDENCY, WIN32COM_AVAILABLE, MAX_EXCEL_WORKERS, LOG_FLUSH_MS, XL_CALCULATION_MANUAL,
+    SplitterAppMixin, sanitize_folder_name, split_source_path, fast_copy, find_header_column,
+    read_unique_reviewers, group_reviewers_by_output, save_workbook, create_excel_app, release_excel_app,
+    read_column_values, read_sheet_layout,
+)
+
+# Logic Imports (依賴請事先以 pip install -r requirements.txt 安裝，缺少時由 App 顯示錯誤)
 try:
-    import pandas as pd
-except ImportError:
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "pandas", "openpyxl"])
-    import pandas as pd
-
-# Windows COM Import
-WIN32COM_AVAILABLE = False
-if platform.system() == 'Windows':
-    try:
-        import win32com.client
-        import pythoncom
-        WIN32COM_AVAILABLE = True
-    except: pass
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter, range_boundaries
+    from openpyxl.worksheet.filters import AutoFilter
+    from openpyxl.xml import LXML
+except ImportError as e:
+    MISSING_DEPENDENCY = e
+
+# Windows COM Import (備用 Excel 需要在各執行緒自行 CoInitialize)
+if WIN32COM_AVAILABLE:
+    import pythoncom
 
 # ==========================================
 # 1. Helper Functions
 # ==========================================
 
-excel_com_instance = None
+# 未指定 excel_app 時的備用 Excel，每個執行緒各自一個 (COM 物件不可跨執行緒共用)
+_excel_tls = threading.local()
 log_file_handle = None
 
-def sanitize_folder_name(name: str) -> str:
-    invalid_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|', '#', '%']
-    sanitized = str(name).strip()
-    for char in invalid_chars:
-        sanitized = sanitized.replace(char, '_')
-    return sanitized[:255].rstrip()
+XL_FILTER_VALUES = 7
+
+def filter_text(val):
+    """篩選比對用的字串：數字 ID 以整數字串表示 (7.0 -> "7")，與 Excel 篩選清單顯示一致。"""
+    if isinstance(val, float) and val.is_integer(): val = int(val)
+    return str(val).strip()
+
+def filter_key(val):
+    """隱藏列的比對鍵：filter_text 再轉小寫 (casefold)，與 Excel 篩選一樣不分大小寫。"""
+    return filter_text(val).casefold()
+
+def discover_reviewers(file_path, column_name):
+    """
+    .xlsx/.xlsm 專用：整欄只串流讀一次 (read_only)，同時回傳
+    (不重複的審稿人, 第 2 列起每列的 filter_key)；找不到欄位時回傳 (None, None)。
+    每個 Reviewer 共用這份 filter_key 決定要隱藏哪些列，不必在完整載入的活頁簿上再掃一次。
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        col_idx = find_header_column(header, column_name)
+        if col_idx == 0: return None, None
+
+        seen = {}
+        filter_keys = []
+        for (val,) in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx, values_only=True):
+            if val is not None and val not in seen:
+                seen[val] = None
+            filter_keys.append(filter_key(val))
+        return list(seen), filter_keys
+    finally:
+        wb.close()
 
 # ==========================================
 # 2. Excel COM Logic (Hiding Mode)
 # ==========================================
 
+def read_first_value(ws, col_idx, last_row):
+    """整欄一次讀回，取第一個非空值 (用來判斷欄位是數字 ID 還是字串姓名)。"""
+    return next((v for v in read_column_values(ws, col_idx, last_row) if v is not None), None)
+
 def initialize_excel_com(logger):
-    global excel_com_instance
-    if WIN32COM_AVAILABLE and excel_com_instance is None:
+    """回傳目前執行緒的備用 Excel，第一次呼叫時才啟動；失敗回傳 None。"""
+    excel_app = getattr(_excel_tls, "app", None)
+    if WIN32COM_AVAILABLE and excel_app is None:
         try:
             pythoncom.CoInitialize()
-            excel_com_instance = win32com.client.Dispatch("Excel.Application")
-            excel_com_instance.Visible = False
-            excel_com_instance.DisplayAlerts = False
-            return True
+            excel_app = _excel_tls.app = create_excel_app()
         except Exception as e:
             logger(f"  ❌ COM 初始化失敗: {e}")
-            return False
-    return excel_com_instance is not None
+    return excel_app
 
 def cleanup_excel_com():
-    global excel_com_instance
-    if excel_com_instance:
-        try: excel_com_instance.Quit()
-        except: pass
-        excel_com_instance = None
+    excel_app = getattr(_excel_tls, "app", None)
+    if excel_app is not None:
+        release_excel_app(excel_app)
+        _excel_tls.app = None
+        pythoncom.CoUninitialize()
 
-def process_reviewer_hide_only(file_path, reviewer, column_name, output_folder, logger):
+def process_reviewer_hide_only(file_path, reviewer, column_name, output_folder, logger, excel_app=None, wb_source=None, layout=None, sample_val=None, members=None):
     """
     這個函數只會套用篩選器 (Filter)，讓非該 Reviewer 的資料隱藏，而不刪除任何資料。
+    excel_app 未指定時使用目前執行緒的備用 Excel (initialize_excel_com)；
+    wb_source 為同一個 Excel 中已開啟 (唯讀) 的原始檔，有傳入時直接在它上面套篩選再 SaveCopyAs，
+    副本不必再開啟、存檔。
+    layout / sample_val 為呼叫端從原始檔讀好的 (last_row, last_col, col_idx) 與該欄第一個非空值，
+    有傳入就不必每個 Reviewer 重讀標頭與整欄。
+    members 為併入同一份輸出的所有審稿人 (group_reviewers_by_output)，預設只有 reviewer。
     """
     if not WIN32COM_AVAILABLE: return False, None
-    global excel_com_instance
-    if not initialize_excel_com(logger): return False, None
+    if excel_app is None:
+        excel_app = initialize_excel_com(logger)
+        if excel_app is None: return False, None
     
     wb_dest = None
     try:
@@ -83,56 +120,63 @@ def process_reviewer_hide_only(file_path, reviewer, column_name, output_folder,
         r_folder = os.path.join(output_folder, r_name)
         os.makedirs(r_folder, exist_ok=True)
         
-        base, ext = os.path.splitext(os.path.basename(file_path))
+        _, base, ext = split_source_path(file_path)
         dst_path = os.path.join(r_folder, f"{base} - {r_name}{ext}")
         
-        # 1. 複製檔案
-        shutil.copy2(file_path, dst_path)
-        
-        # 2. 開啟副本
         abs_dst = os.path.abspath(dst_path)
-        wb_dest = excel_com_instance.Workbooks.Open(abs_dst)
-        ws = wb_dest.Worksheets(1)
+
+        # 1~2. 有已開啟的原始檔就直接在上面篩選；否則複製後開啟副本
+        if wb_source is not None:
+            ws = wb_source.Worksheets(1)
+        else:
+            fast_copy(file_path, dst_path)
+            wb_dest = excel_app.Workbooks.Open(abs_dst)
+            ws = wb_dest.Worksheets(1)
         
         # 先清除舊的篩選
         if ws.AutoFilterMode:
             ws.AutoFilterMode = False
 
-        # 3. 抓取範圍
-        last_row = ws.UsedRange.Rows.Count
-        last_col = ws.UsedRange.Columns.Count
-        
-        # 4. 找欄位索引
-        col_idx = 0
-        for col in range(1, last_col + 1):
-            if str(ws.Cells(1, col).Value).strip() == str(column_name).strip():
-                col_idx = col
-                break
+        # 3~4. 範圍與欄位索引 (一次讀回整列標頭，避免逐格 COM 呼叫)
+        if layout is None:
+            layout = read_sheet_layout(ws, column_name)
+            sample_val = None
+        last_row, last_col, col_idx = layout
         
         if col_idx == 0:
             logger(f"  ❌ 找不到欄位: {column_name}")
-            wb_dest.Close(False)
+            if wb_dest: wb_dest.Close(False)
             return False, None
 
-        # 5. 判斷型態 (處理數字 ID vs 字串姓名)
-        sample_val = ws.Cells(2, col_idx).Value
-        criteria = reviewer
-        if isinstance(sample_val, (int, float)):
-            try:
-                # 轉成浮點數以符合 Excel 內部的數值存儲
-                criteria = float(reviewer)
-                if criteria.is_integer(): criteria = int(criteria)
-            except: pass
+        # 5. 判斷型態 (處理數字 ID vs 字串姓名)：整欄一次讀回，取第一個非空值
+        if sample_val is None:
+            sample_val = read_first_value(ws, col_idx, last_row)
+        criteria = []
+        for m in members or [reviewer]:
+            if isinstance(sample_val, (int, float)):
+                try:
+                    # 轉成浮點數以符合 Excel 內部的數值存儲
+                    m = float(m)
+                    if m.is_integer(): m = int(m)
+                except: pass
+            criteria.append(m)
 
         # 6. 【關鍵：套用篩選】
         # 這裡 Criteria1 直接等於 reviewer (不加 <>)
         # Excel 會自動把不符合的人隱藏起來
         data_range = ws.Range(ws.Cells(1, 1), ws.Cells(last_row, last_col))
-        data_range.AutoFilter(Field=col_idx, Criteria1=criteria)
+        if len(criteria) == 1:
+            data_range.AutoFilter(Field=col_idx, Criteria1=criteria[0])
+        else:
+            # 合併的審稿人：多值篩選 (xlFilterValues 以顯示文字比對)
+            data_range.AutoFilter(Field=col_idx, Criteria1=[str(c) for c in criteria], Operator=XL_FILTER_VALUES)
 
         # 7. 存檔並關閉 (注意：不關閉 AutoFilterMode，這樣開啟時才是篩選狀態)
-        wb_dest.Save()
-        wb_dest.Close()
+        if wb_dest:
+            save_workbook(excel_app, wb_dest.Save)
+            wb_dest.Close()
+        else:
+            save_workbook(excel_app, lambda: wb_source.SaveCopyAs(abs_dst))
         
         logger(f"  ✅ 已隱藏非 {reviewer} 之資料並存檔")
         return True, r_folder
@@ -142,21 +186,118 @@ def process_reviewer_hide_only(file_path, reviewer, column_name, output_folder,
         if wb_dest: wb_dest.Close(False)
         return False, None
 
+def find_filter_table(ws, col_idx):
+    """
+    含審稿人欄位的 Excel 表格 (ListObject)，沒有表格時回傳 None。
+    表格範圍內的篩選只能寫在表格自己的 autoFilter，工作表層級再寫一個 <autoFilter> 會被 Excel 判為損毀；
+    表格不從第 1 列開始、不含該欄或不只一個時無法對應，丟出 ValueError。
+    """
+    tables = list(ws.tables.values())
+    if not tables: return None
+    if len(tables) == 1:
+        table = tables[0]
+        min_col, min_row, max_col, _ = range_boundaries(table.ref)
+        if min_row == 1 and min_col <= col_idx <= max_col and table.headerRowCount != 0:
+            return table
+    raise ValueError("工作表中的表格無法以快速模式篩選，請取消「快速 .xlsx 模式」改用 Excel")
+
+def process_reviewer_hide_openpyxl(file_path, reviewer, column_name, output_folder, logger, filter_keys=None, members=None, wb=None):
+    """
+    .xlsx 專用，不啟動 Excel：直接寫入 autoFilter 條件，並把非該 Reviewer 的列標為隱藏，
+    開檔時看到的結果與 COM 版 AutoFilter 相同。資料是 Excel 表格時條件寫進表格的 autoFilter。
+    openpyxl 存檔會丟掉它不支援的內容 (圖形、表單控制項、交叉分析篩選器等)，有 Excel 時只在使用者勾選時使用。
+    filter_keys 為 discover_reviewers 的結果 (整批只讀一次)；未傳入時自行讀取。
+    members 同 process_reviewer_hide_only。
+    wb 為呼叫端已完整載入的原始檔，可連續給多個 Reviewer 使用 (篩選與隱藏列每次都重設後另存新檔)；
+    未傳入時自行載入。
+    """
+    try:
+        r_name = sanitize_folder_name(str(reviewer))
+        r_folder = os.path.join(output_folder, r_name)
+        os.makedirs(r_folder, exist_ok=True)
+
+        _, base, ext = split_source_path(file_path)
+        dst_path = os.path.join(r_folder, f"{base} - {r_name}{ext}")
+
+        if filter_keys is None:
+            filter_keys = discover_reviewers(file_path, column_name)[1]
+
+        if wb is None:
+            wb = load_workbook(file_path)
+        ws = wb.worksheets[0]
+        last_row, last_col = ws.max_row, ws.max_column
+
+        header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        col_idx = find_header_column(header, column_name)
+        if col_idx == 0 or filter_keys is None:
+            logger(f"  ❌ 找不到欄位: {column_name}")
+            return False, None
+
+        targets = list(dict.fromkeys(filter_text(m) for m in members or [reviewer]))
+        target_keys = {t.casefold() for t in targets}
+
+        table = find_filter_table(ws, col_idx)
+        if table is None:
+            auto_filter = ws.auto_filter
+            auto_filter.ref = f"A1:{get_column_letter(last_col)}{last_row}"
+            first_col = 1
+        else:
+            ws.auto_filter.ref = None
+            first_col, _, max_col, max_row = range_boundaries(table.ref)
+            if table.autoFilter is None:
+                # 篩選按鈕被關掉的表格：範圍不含合計列
+                table.autoFilter = AutoFilter(ref=f"{get_column_letter(first_col)}1:{get_column_letter(max_col)}{max_row - (table.totalsRowCount or 0)}")
+            auto_filter = table.autoFilter
+        auto_filter.filterColumn = []
+        auto_filter.add_filter_column(col_idx - first_col, targets)
+
+        # 依預先讀好的每列比對字串設定隱藏，不再逐列讀取儲存格 (符合的列一律取消隱藏，上一個 Reviewer 的設定不會殘留)
+        for r, key in enumerate(filter_keys, start=2):
+            if key not in target_keys:
+                ws.row_dimensions[r].hidden = True
+            elif r in ws.row_dimensions:
+                ws.row_dimensions[r].hidden = False
+
+        wb.save(dst_path)
+        logger(f"  ✅ 已隱藏非 {reviewer} 之資料並存檔")
+        return True, r_folder
+
+    except Exception as e:
+        logger(f"  ❌ 發生錯誤: {e}")
+        return False, None
+
 # ==========================================
 # 3. GUI Application (簡化版)
 # ==========================================
 
-class App(tk.Tk):
+class App(SplitterAppMixin, tk.Tk):
+    EXCEL_ERROR_LOG = "❌ Excel worker 錯誤: {}"
+    CLOSE_PROMPT = ("仍在處理中", "目前仍在處理中。\n要在目前的審稿人完成後停止並關閉嗎？")
+
     def __init__(self):
         super().__init__()
         self.title("Excel 隱藏版分檔工具 (PTT 版)")
         self.geometry("700 objetivos 650")
+
+        if MISSING_DEPENDENCY is not None:
+            messagebox.showerror("Missing dependency", f"{MISSING_DEPENDENCY}\n\npip install -r requirements.txt")
+            self.destroy()
+            return
         
         self.file_path_var = tk.StringVar()
         self.col_name_var = tk.StringVar(value="Reviewer")
         self.out_dir_var = tk.StringVar()
+        # 沒有 Excel 時 .xlsx 只能走 openpyxl，強制勾選
+        self.fast_xlsx_var = tk.BooleanVar(value=not WIN32COM_AVAILABLE)
+        self._log_q = queue.Queue()
+        self._last_ts = (0, "")
+        self._excel_hosts = []  # 每個常駐 Excel 一組 (thread, task_q)，程式關閉前都不結束
+        self._running = False
+        self._closing = threading.Event()  # 關窗時設定：worker 不再領取新的審稿人
         
         self.create_widgets()
+        self.after(LOG_FLUSH_MS, self._drain_log)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def create_widgets(self):
         main_frame = ttk.Frame(self, padding=20)
@@ -177,6 +318,11 @@ class App(tk.Tk):
         ttk.Entry(d_frame, textvariable=self.out_dir_var).pack(side="left", fill="x", expand=True)
         ttk.Button(d_frame, text="瀏覽", command=self.browse_folder).pack(side="right")
 
+        ttk.Checkbutton(
+            main_frame, text="快速 .xlsx 模式 (不經 Excel；圖形、表單控制項、交叉分析篩選器等不會保留)",
+            variable=self.fast_xlsx_var, state="normal" if WIN32COM_AVAILABLE else "disabled"
+        ).pack(anchor="w", pady=(10, 0))
+
         self.btn_run = ttk.Button(main_frame, text="🚀 開始分發 (僅隱藏模式)", command=self.start_thread)
         self.btn_run.pack(pady=20, fill="x")
 
@@ -192,14 +338,56 @@ class App(tk.Tk):
         if d: self.out_dir_var.set(d)
 
     def log(self, msg):
-        self.log_area.config(state='normal')
-        self.log_area.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {msg}\n")
-        self.log_area.see(tk.END)
-        self.log_area.config(state='disabled')
+        # 可從任何執行緒呼叫；實際寫入畫面由 _drain_log 在 Tk 執行緒批次處理
+        self._log_q.put(f"[{self._timestamp()}] {msg}")
 
     def start_thread(self):
         self.btn_run.config(state="disabled")
-        threading.Thread(target=self.run_process, daemon=True).start()
+        self._running = True
+        # 非 daemon：關窗後仍讓目前的審稿人做完、常駐 Excel 正常結束
+        threading.Thread(target=self.run_process).start()
+
+    def openpyxl_worker(self, work_q, f_path, col, out, filter_keys):
+        # 原始檔每個 worker 只完整載入一次，之後每個 Reviewer 重設篩選再存成新檔 (zip 壓縮與檔案 I/O 期間會釋放 GIL)
+        try:
+            wb = load_workbook(f_path)
+        except Exception as e:
+            self.log(f"❌ 無法開啟原始檔: {e}")
+            return
+        # openpyxl 讀入的圖片 (有安裝 Pillow 時) 存檔一次後就無法再寫出，這種檔案每個 Reviewer 重新載入
+        if any(ws._images for ws in wb.worksheets): wb = None
+        while not self._closing.is_set():
+            try: r, members = work_q.get_nowait()
+            except queue.Empty: break
+            self.log(f"正在處理: {r}...")
+            process_reviewer_hide_openpyxl(f_path, r, col, out, self.log, filter_keys=filter_keys, members=members, wb=wb)
+
+    def excel_worker(self, excel_app, work_q, f_path, col, out):
+        wb_source = None
+        try:
+            # 原始檔每個 worker 只開一次
+            wb_source = excel_app.Workbooks.Open(split_source_path(f_path)[0], ReadOnly=True)
+            # 啟動時若因沒有活頁簿而設不成手動計算，開檔後再設一次
+            try: excel_app.Calculation = XL_CALCULATION_MANUAL
+            except: pass
+            # 標頭與欄位型態也只讀一次：套篩選不會改變範圍與儲存格值
+            ws = wb_source.Worksheets(1)
+            if ws.AutoFilterMode:
+                ws.AutoFilterMode = False
+            layout = read_sheet_layout(ws, col)
+            sample_val = read_first_value(ws, layout[2], layout[0]) if layout[2] else None
+            while not self._closing.is_set():
+                try: r, members = work_q.get_nowait()
+                except queue.Empty: break
+                self.log(f"正在處理: {r}...")
+                process_reviewer_hide_only(f_path, r, col, out, self.log, excel_app=excel_app, wb_source=wb_source,
+                                           layout=layout, sample_val=sample_val, members=members)
+        except Exception as e:
+            self.log(f"❌ Excel worker 錯誤: {e}")
+        finally:
+            if wb_source is not None:
+                try: wb_source.Close(False)
+                except: pass
 
     def run_process(self):
         f_path = self.file_path_var.get()
@@ -208,26 +396,66 @@ class App(tk.Tk):
         
         if not f_path or not out:
             messagebox.showwarning("警告", "請填好路徑！")
+            self._running = False
             self.btn_run.config(state="normal")
             return
 
         try:
             self.log("讀取審稿清單中...")
-            df = pd.read_excel(f_path)
-            reviewers = df[col].dropna().unique().tolist()
-            
-            pythoncom.CoInitialize()
-            for r in reviewers:
-                self.log(f"正在處理: {r}...")
-                process_reviewer_hide_only(f_path, r, col, out, self.log)
-                
+            is_xlsx = os.path.splitext(f_path)[1].lower() == ".xlsx"
+            use_fast = is_xlsx and (self.fast_xlsx_var.get() or not WIN32COM_AVAILABLE)
+            if use_fast:
+                # 審稿清單與每列的比對字串在同一次串流讀取中取得
+                reviewers, filter_keys = discover_reviewers(f_path, col)
+            else:
+                reviewers = read_unique_reviewers(f_path, col)
+            if reviewers is None:
+                self.log(f"❌ 找不到欄位: {col}")
+                return
+
+            # 輸出路徑相同的審稿人先合併，避免多個 worker 同時寫同一個檔案
+            groups = group_reviewers_by_output(reviewers)
+            for r, members in groups:
+                if len(members) > 1:
+                    self.log(f"⚠️ {', '.join(repr(m) for m in members)} 的輸出資料夾相同，合併為一份: {r}")
+
+            if use_fast:
+                # .xlsx 直接用 openpyxl 寫入篩選，不需要 Excel
+                if not LXML:
+                    self.log("⚠️ 未安裝 lxml，openpyxl 讀寫大檔會較慢 (pip install lxml)")
+                work_q = queue.Queue()
+                for g in groups: work_q.put(g)
+                n_workers = max(1, min(MAX_OPENPYXL_WORKERS, len(groups)))
+                workers = [
+                    threading.Thread(target=self.openpyxl_worker, args=(work_q, f_path, col, out, filter_keys), daemon=True)
+                    for _ in range(n_workers)
+                ]
+                for t in workers: t.start()
+                for t in workers: t.join()
+            elif not WIN32COM_AVAILABLE:
+                self.log("❌ 非 .xlsx 檔案需要 Windows Excel")
+                return
+            else:
+                # 每個 worker 使用一個常駐的隱藏 Excel，從同一個佇列領取審稿人
+                work_q = queue.Queue()
+                for g in groups: work_q.put(g)
+                n_workers = max(1, min(MAX_EXCEL_WORKERS, len(groups)))
+                self.run_on_excel_hosts(n_workers, lambda excel_app: self.excel_worker(excel_app, work_q, f_path, col, out))
+
+            if self._closing.is_set():
+                self.log("⏹️ 已中止")
+                return
             self.log("🎉 全部處理完成！")
             messagebox.showinfo("完成", "檔案已產出，非該人資料已隱藏。")
         except Exception as e:
             self.log(f"❌ 錯誤: {e}")
         finally:
             cleanup_excel_com()
-            self.btn_run.config(state="normal")
+            if self._closing.is_set():
+                self.join_excel_hosts()
+            self._running = False
+            if not self._closing.is_set():
+                self.btn_run.config(state="normal")
 
 if __name__ == "__main__":
     app = App()
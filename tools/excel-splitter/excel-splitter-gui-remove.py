@@ -1,195 +1,239 @@
-import sys
 import os
-import shutil
-import glob
-import platform
 import threading
-import subprocess
+import queue
 from datetime import datetime
 
 # --- CONFIGURATION ---
 LOG_ROOT_DIR = os.path.join(os.getcwd(), "logs") 
+MAX_COPY_WORKERS = 4
+LOG_BUFFER_BYTES = 64 * 1024
 
 # GUI Imports
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
-# Logic Imports
+# Shared file/COM helpers and Tk plumbing (splitter_common.py next to this script)
+from splitter_common import (
+    MISSING_DEPENDENCY, WIN32COM_AVAILABLE, MAX_EXCEL_WORKERS, LOG_FLUSH_MS, XL_CALCULATION_MANUAL,
+    SplitterAppMixin, sanitize_folder_name, split_source_path, fast_copy, find_header_column,
+    read_unique_reviewers, group_reviewers_by_output, save_workbook, read_column_values, read_sheet_layout,
+)
+
+# Logic Imports (install with pip install -r requirements.txt; App reports anything missing)
 try:
-    import pandas as pd
-except ImportError:
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "pandas", "openpyxl"])
-    import pandas as pd
-
-# Windows COM Import
-WIN32COM_AVAILABLE = False
-if platform.system() == 'Windows':
-    try:
-        import win32com.client
-        import pythoncom
-        WIN32COM_AVAILABLE = True
-    except ImportError:
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "pywin32"])
-            import win32com.client
-            import pythoncom
-            WIN32COM_AVAILABLE = True
-        except:
-            pass
+    import numpy as np
+    from openpyxl import Workbook, load_workbook
+except ImportError as e:
+    MISSING_DEPENDENCY = e
 
 # ==========================================
 # 1. Helper Functions
 # ==========================================
 
-excel_com_instance = None
 log_file_handle = None
 
-def sanitize_folder_name(name: str) -> str:
-    invalid_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|', '#', '%']
-    sanitized = str(name).strip()
-    for char in invalid_chars:
-        sanitized = sanitized.replace(char, '_')
-    return sanitized[:255].rstrip()
+XL_SHIFT_UP = -4162
 
-def copy_selected_documents(source_dir, dest_dir, logger):
-    for pattern in ["*.docx", "*.doc"]:
-        for file in glob.glob(os.path.join(source_dir, pattern)):
-            try:
-                shutil.copy2(file, os.path.join(dest_dir, os.path.basename(file)))
-                logger(f"  📎 Copied Word: {os.path.basename(file)}")
-            except: pass
+_DOCUMENT_LABELS = {".docx": "Word", ".doc": "Word", ".pdf": "PDF"}
 
-    for file in glob.glob(os.path.join(source_dir, "*.pdf")):
+def list_selected_documents(source_dir):
+    """
+    Word/PDF files directly under source_dir as (path, label) pairs, Word first.
+    One os.scandir pass; run_process calls it once and reuses it for every reviewer.
+    """
+    words, pdfs = [], []
+    try:
+        with os.scandir(source_dir) as it:
+            for entry in it:
+                label = _DOCUMENT_LABELS.get(os.path.splitext(entry.name)[1].lower())
+                if label and entry.is_file():
+                    (words if label == "Word" else pdfs).append((entry.path, label))
+    except OSError:
+        return []
+    return words + pdfs
+
+def list_attachments(source_dir, extra_files):
+    """
+    Everything copied into each reviewer folder, as (path, name, label):
+    the Word/PDF files next to the source plus the user's extra files.
+    Built once per run; extra files are checked for existence here, not per reviewer.
+    """
+    attachments = [(path, os.path.basename(path), label) for path, label in list_selected_documents(source_dir)]
+    attachments += [(path, os.path.basename(path), "Extra") for path in extra_files if os.path.isfile(path)]
+    return attachments
+
+def copy_attachments(attachments, dest_dir, logger):
+    # Real copies, not hard links: each reviewer may edit their own files
+    for path, name, label in attachments:
         try:
-            shutil.copy2(file, os.path.join(dest_dir, os.path.basename(file)))
-            logger(f"  📎 Copied PDF: {os.path.basename(file)}")
-        except: pass
-
-def copy_additional_files_list(file_paths: list, dest_dir: str, logger):
-    if not file_paths: return
-    for path in file_paths:
-        if os.path.exists(path) and os.path.isfile(path):
-            try:
-                shutil.copy2(path, os.path.join(dest_dir, os.path.basename(path)))
-                logger(f"  📎 Copied Extra: {os.path.basename(path)}")
-            except Exception as e:
-                logger(f"  ❌ Copy Error: {e}")
+            fast_copy(path, os.path.join(dest_dir, name))
+            logger(f"  📎 Copied {label}: {name}")
+        except Exception as e:
+            logger(f"  ❌ Copy Error: {e}")
+
+def split_xlsx_values(file_path, column_name, reviewer_groups, output_folder, logger):
+    """
+    Pure-Python split for .xlsx, no Excel needed: read the first sheet once
+    (read_only, data_only), then write one workbook per reviewer with openpyxl
+    write_only. Output is values only -- styles, formulas and other sheets are
+    not carried over. reviewer_groups is group_reviewers_by_output's list.
+    Yields (reviewer, success, r_folder) as each file is done.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        title = ws.title
+        rows = list(ws.values)
+    finally:
+        wb.close()
+
+    header = rows[0] if rows else ()
+    data = rows[1:]
+    col_idx = find_header_column(header, column_name) - 1
+    if col_idx < 0:
+        logger(f"  ❌ 找不到欄位 '{column_name}'")
+        return
+
+    # Same matching rule as the COM path (reviewer_key): case-insensitive, 7.0 == 7
+    groups = group_reviewer_rows([r[col_idx] if col_idx < len(r) else None for r in data])
+    _, base, ext = split_source_path(file_path)
+
+    for reviewer, members in reviewer_groups:
+        logger(f"Processing: {reviewer}")
+        try:
+            r_name = sanitize_folder_name(str(reviewer))
+            r_folder = os.path.join(output_folder, r_name)
+            os.makedirs(r_folder, exist_ok=True)
+            dst_path = os.path.join(r_folder, f"{base} - {r_name}{ext}")
+
+            out_wb = Workbook(write_only=True)
+            out_ws = out_wb.create_sheet(title)
+            out_ws.append(header)
+            for i in member_rows(groups, members):
+                out_ws.append(data[i])
+            out_wb.save(dst_path)
+
+            logger(f"  ✅ 處理完成: {os.path.basename(dst_path)}")
+            yield reviewer, True, r_folder
+        except Exception as e:
+            logger(f"  ❌ 嚴重錯誤: {e}")
+            yield reviewer, False, None
 
 # ==========================================
 # 2. Excel COM Logic (Improved)
 # ==========================================
 
-def initialize_excel_com(logger):
-    global excel_com_instance
-    if WIN32COM_AVAILABLE and excel_com_instance is None:
-        try:
-            pythoncom.CoInitialize()
-            excel_com_instance = win32com.client.Dispatch("Excel.Application")
-            excel_com_instance.Visible = False
-            excel_com_instance.DisplayAlerts = False
-            excel_com_instance.ScreenUpdating = False
-            return True
-        except Exception as e:
-            logger(f"  ❌ COM Init Failed: {e}")
-            return False
-    return excel_com_instance is not None
-
-def cleanup_excel_com():
-    global excel_com_instance
-    if excel_com_instance:
-        try:
-            excel_com_instance.Quit()
-        except: pass
-        excel_com_instance = None
-
-def process_reviewer_com(file_path, reviewer, column_name, output_folder, logger):
+def reviewer_key(val):
+    """
+    Normalize a cell value for reviewer matching the way AutoFilter did:
+    7.0 (COM reads numbers as float) equals 7, text is case-insensitive.
+    """
+    if isinstance(val, float) and val.is_integer(): return int(val)
+    if isinstance(val, str): return val.casefold()
+    return val
+
+def group_reviewer_rows(col_values):
+    """
+    Group one bulk column read by reviewer_key: key -> np.ndarray of 0-based
+    data-row indices (sheet row = index + 2).
+    """
+    groups = {}
+    for i, v in enumerate(col_values):
+        groups.setdefault(reviewer_key(v), []).append(i)
+    return {k: np.asarray(rows, dtype=np.int64) for k, rows in groups.items()}
+
+def member_rows(groups, members):
+    """Sorted union of the group_reviewer_rows indices of every member."""
+    rows = [groups[k] for k in dict.fromkeys(map(reviewer_key, members)) if k in groups]
+    return np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+def delete_row_runs(keep_rows, last_row):
+    """
+    Sheet rows 2..last_row not in keep_rows (0-based data indices), coalesced
+    into contiguous (first, last) runs, bottom-most first so earlier deletes
+    do not shift the rows of later ones.
+    """
+    delete_rows = np.setdiff1d(np.arange(max(last_row - 1, 0)), keep_rows, assume_unique=True) + 2
+    if delete_rows.size == 0: return []
+    runs = np.split(delete_rows, np.flatnonzero(np.diff(delete_rows) != 1) + 1)
+    return [(int(run[0]), int(run[-1])) for run in reversed(runs)]
+
+def process_reviewer_com(file_path, reviewer, column_name, output_folder, logger, excel_app, wb_source, layout=None, keep_rows=None,
+                         source_filtered=True):
+    """
+    wb_source: the source workbook, opened once (read-only) in excel_app by the
+    caller; only used for SaveCopyAs if the plain file copy fails.
+    layout: (last_row, last_col, col_idx) read once from wb_source; the copy has
+    the same shape, so the header does not have to be searched again.
+    keep_rows: this reviewer's 0-based data-row indices from group_reviewer_rows;
+    when given the reviewer column is not read again. With layout too, a reviewer
+    owning none is skipped, and one owning every row is a plain file copy as long
+    as source_filtered is False (the copy would keep the source's AutoFilter).
+    """
     if not WIN32COM_AVAILABLE: return False, None
-    global excel_com_instance
-    if not initialize_excel_com(logger): return False, None
     
-    wb_source = None
     wb_dest = None
+    # Row count known up front only when the layout has data and the column was found
+    n_keep = len(keep_rows) if layout and layout[0] >= 2 and layout[2] and keep_rows is not None else None
     
     try:
+        if n_keep == 0:
+            logger(f"  ⚠️ 找不到 {reviewer} 的資料列，跳過。")
+            return False, None
+
         r_name = sanitize_folder_name(str(reviewer))
         r_folder = os.path.join(output_folder, r_name)
         os.makedirs(r_folder, exist_ok=True)
         
-        base, ext = os.path.splitext(os.path.basename(file_path))
+        abs_src, base, ext = split_source_path(file_path)
         dst_path = os.path.join(r_folder, f"{base} - {r_name}{ext}")
-        
-        abs_src = os.path.abspath(file_path)
         abs_dst = os.path.abspath(dst_path)
         
-        # 1. 先做備份
-        wb_source = excel_com_instance.Workbooks.Open(abs_src, ReadOnly=True)
-        wb_source.SaveCopyAs(abs_dst)
-        wb_source.Close(False)
+        # 1. 先做備份：直接複製檔案，不經 Excel 另存；複製失敗 (例如檔案被鎖) 才用 SaveCopyAs
+        try: fast_copy(abs_src, abs_dst)
+        except OSError: wb_source.SaveCopyAs(abs_dst)
+
+        # 全部資料列都屬於該審稿人且原始檔沒有篩選：副本即為結果，不必開啟 Excel
+        if n_keep is not None and n_keep >= layout[0] - 1 and not source_filtered:
+            logger(f"  ✅ 處理完成: {os.path.basename(dst_path)}")
+            return True, r_folder
         
         # 2. 開啟新檔進行刪減
-        wb_dest = excel_com_instance.Workbooks.Open(abs_dst)
+        wb_dest = excel_app.Workbooks.Open(abs_dst)
         ws = wb_dest.Worksheets(1)
         
         # 強制關閉原本可能存在的篩選
         if ws.AutoFilterMode:
             ws.AutoFilterMode = False
 
-        # 3. 抓取正確的範圍 (UsedRange 最保險)
-        last_row = ws.UsedRange.Rows.Count
-        last_col = ws.UsedRange.Columns.Count
+        # 3~4. 範圍 (UsedRange) 與標頭索引：沿用從原始檔讀好的 layout
+        last_row, last_col, col_idx = layout or read_sheet_layout(ws, column_name)
         
         if last_row < 2:
             logger(f"  ⚠️ 檔案無資料列，跳過。")
             wb_dest.Close(True)
             return True, r_folder
 
-        # 4. 尋找標頭索引
-        col_idx = 0
-        for col in range(1, last_col + 1):
-            if str(ws.Cells(1, col).Value).strip() == str(column_name).strip():
-                col_idx = col
-                break
-                
         if col_idx == 0:
             logger(f"  ❌ 找不到欄位 '{column_name}'")
             wb_dest.Close(False)
             return False, None
 
-        # 5. 【關鍵 fix】處理篩選條件與型態
-        # 先抓第二列的第一筆資料來判斷這欄是數字還是字串
-        sample_val = ws.Cells(2, col_idx).Value
-        if isinstance(sample_val, (int, float)):
-            try:
-                # 確保數值比對是一致的
-                criteria_str = f"<>{float(reviewer):.0f}" if float(reviewer).is_integer() else f"<>{float(reviewer)}"
-            except:
-                criteria_str = f"<>{reviewer}"
-        else:
-            criteria_str = f"<>{reviewer}"
-
-        # 6. 【執行篩選】 範圍必須包含 Header (Row 1)
-        data_range = ws.Range(ws.Cells(1, 1), ws.Cells(last_row, last_col))
-        data_range.AutoFilter(Field=col_idx, Criteria1=criteria_str)
-
-        # 7. 【精確刪除】 僅選取除了 Header 以外的資料列
-        try:
-            # 建立純資料範圍 (從 Row 2 開始)
-            body_range = ws.Range(ws.Cells(2, 1), ws.Cells(last_row, last_col))
-            
-            # xlCellTypeVisible = 12
-            # 只針對「顯示出來」(即不等於該審稿人) 的列進行刪除
-            visible_cells = body_range.SpecialCells(12) 
-            if visible_cells:
-                visible_cells.EntireRow.Delete()
-                logger(f"  ✨ 已刪除其他 Reviewer 資料")
-        except Exception as e:
-            # 如果報錯 1004 通常是因為篩選後沒有剩餘列 (代表全部都是該 Reviewer 的資料)
-            if "1004" not in str(e):
-                logger(f"  ⚠️ 刪除過程異常: {e}")
+        # 5. 該審稿人要保留的列 (沒有預先分組時才整欄讀回比對)
+        if keep_rows is None:
+            target = reviewer_key(reviewer)
+            col_values = read_column_values(ws, col_idx, last_row)
+            keep_rows = np.flatnonzero([reviewer_key(v) == target for v in col_values])
+
+        # 6~7. 其餘列合併成連續區段，由下往上每段一次 Delete (不排序，列順序與跨列公式參照維持原樣)
+        runs = delete_row_runs(keep_rows, last_row)
+        for first, last in runs:
+            ws.Range(ws.Rows(first), ws.Rows(last)).Delete(Shift=XL_SHIFT_UP)
+        if runs:
+            logger(f"  ✨ 已刪除其他 Reviewer 資料")
 
         # 8. 收尾
-        ws.AutoFilterMode = False
-        wb_dest.Save()
+        save_workbook(excel_app, wb_dest.Save)
         wb_dest.Close()
         
         logger(f"  ✅ 處理完成: {os.path.basename(dst_path)}")
@@ -206,7 +250,7 @@ def process_reviewer_com(file_path, reviewer, column_name, output_folder, logger
 # 3. GUI Application
 # ==========================================
 
-class App(tk.Tk):
+class App(SplitterAppMixin, tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Excel Reviewer Splitter (COM Only)")
@@ -215,14 +259,33 @@ class App(tk.Tk):
         self.file_path_var = tk.StringVar()
         self.col_name_var = tk.StringVar(value="Reviewer")
         self.out_dir_var = tk.StringVar()
+        self.fast_xlsx_var = tk.BooleanVar(value=False)
         self.extra_files = [] 
+        self._extra_set = set()  # membership for extra_files, which keeps the order
+        self.log_file_handle = None
+        self._log_q = queue.Queue()
+        self._progress_q = queue.Queue()  # (text, value, maximum) for the progress widgets, applied by _drain_log
+        self._last_ts = (0, "")
+        self._log_lock = threading.Lock()
+        self._excel_hosts = []  # (thread, task_q) per warm Excel, kept for the app's lifetime
+        self._running = False
+        self._closing = threading.Event()  # set on window close: workers stop taking reviewers
+        self.done_count = 0  # reviewers finished in the current run, shared by the Excel workers
+        self.done_lock = threading.Lock()
         
-        if not WIN32COM_AVAILABLE:
-            messagebox.showerror("Error", "Windows Excel Required.")
+        if MISSING_DEPENDENCY is not None:
+            messagebox.showerror("Missing dependency", f"{MISSING_DEPENDENCY}\n\npip install -r requirements.txt")
             self.destroy()
             return
 
+        if not WIN32COM_AVAILABLE:
+            # No Excel: .xlsx files can still be split with openpyxl
+            messagebox.showwarning("Excel not available", "Windows Excel not found.\nOnly .xlsx files can be split (values only, no formatting).")
+            self.fast_xlsx_var.set(True)
+
         self.create_widgets()
+        self.after(LOG_FLUSH_MS, self._drain_log)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def create_widgets(self):
         pnl = ttk.LabelFrame(self, text="File Settings", padding=10)
@@ -239,6 +302,11 @@ class App(tk.Tk):
         ttk.Entry(pnl, textvariable=self.out_dir_var, width=55).grid(row=2, column=1, padx=5)
         ttk.Button(pnl, text="Browse", command=self.browse_folder).grid(row=2, column=2)
 
+        ttk.Checkbutton(
+            pnl, text="Fast .xlsx split without Excel (values only, no formatting)", variable=self.fast_xlsx_var,
+            state="normal" if WIN32COM_AVAILABLE else "disabled"
+        ).grid(row=3, column=1, sticky="w", pady=(5, 0))
+
         pnl_files = ttk.LabelFrame(self, text="Attachments", padding=10)
         pnl_files.pack(fill="x", padx=10, pady=5)
         
@@ -277,31 +345,103 @@ class App(tk.Tk):
 
     def add_extra_files(self):
         files = filedialog.askopenfilenames()
-        for f in files:
-            if f not in self.extra_files:
-                self.extra_files.append(f)
-                self.lst_files.insert(tk.END, f)
+        new_files = [f for f in dict.fromkeys(files) if f not in self._extra_set]
+        if not new_files: return
+        self._extra_set.update(new_files)
+        self.extra_files.extend(new_files)
+        self.lst_files.insert(tk.END, *new_files)
     
     def clear_extra_files(self):
         self.extra_files = []
+        self._extra_set.clear()
         self.lst_files.delete(0, tk.END)
 
     def log(self, msg, level="INFO"):
-        ts = datetime.now().strftime("%H:%M:%S")
-        full_msg = f"[{ts}] {msg}"
-        self.log_area.config(state='normal')
-        self.log_area.insert(tk.END, full_msg + "\n")
-        self.log_area.see(tk.END)
-        self.log_area.config(state='disabled')
-        if self.log_file_handle:
-            try: self.log_file_handle.write(full_msg + "\n"); self.log_file_handle.flush()
-            except: pass
+        # Safe from any thread: the widget is updated in batches by _drain_log,
+        # the file write is buffered and flushed once per reviewer (_flush_log_file).
+        full_msg = f"[{self._timestamp()}] {msg}"
+        self._log_q.put(full_msg)
+        with self._log_lock:
+            if self.log_file_handle:
+                try: self.log_file_handle.write(full_msg + "\n")
+                except: pass
+
+    def _drain_log(self):
+        # Progress updates are applied on the same Tk tick as the log lines
+        try:
+            while True:
+                text, value, maximum = self._progress_q.get_nowait()
+                if maximum is not None: self.progress["maximum"] = maximum
+                if value is not None: self.progress["value"] = value
+                if text is not None: self.lbl_progress.config(text=text)
+        except queue.Empty:
+            pass
+        super()._drain_log()
+
+    def set_progress(self, text=None, value=None, maximum=None):
+        # Safe from any thread, like log(): the widgets are only touched by _drain_log
+        self._progress_q.put((text, value, maximum))
+
+    def _flush_log_file(self):
+        with self._log_lock:
+            if self.log_file_handle:
+                try: self.log_file_handle.flush()
+                except: pass
 
     def start_thread(self):
         self.btn_run.config(state="disabled")
+        self._running = True
         t = threading.Thread(target=self.run_process)
         t.start()
 
+    def copy_worker(self, copy_q):
+        # Attachment copies for finished reviewers run here, overlapping the next reviewer's split
+        while True:
+            job = copy_q.get()
+            if job is None: break
+            attachments, r_folder = job
+            copy_attachments(attachments, r_folder, self.log)
+
+    def excel_worker(self, excel_app, work_q, file_path, col_name, out_folder, total, attachments, copy_q):
+        wb_source = None
+        try:
+            # Open the source once per worker to read the layout and group the reviewer rows
+            wb_source = excel_app.Workbooks.Open(split_source_path(file_path)[0], ReadOnly=True)
+            # Manual calculation may not have stuck at start-up with no workbook open
+            try: excel_app.Calculation = XL_CALCULATION_MANUAL
+            except: pass
+            ws_source = wb_source.Worksheets(1)
+            layout = read_sheet_layout(ws_source, col_name)
+            # Outputs are saved without an AutoFilter, so a plain copy only fits an unfiltered source
+            source_filtered = bool(ws_source.AutoFilterMode)
+            # Group reviewer -> rows once from a single column read; every reviewer reuses it
+            last_row, _, col_idx = layout
+            groups = group_reviewer_rows(read_column_values(ws_source, col_idx, last_row)) if col_idx else {}
+            while not self._closing.is_set():
+                try: reviewer, members = work_q.get_nowait()
+                except queue.Empty: break
+                self.log(f"Processing: {reviewer}")
+
+                success, r_folder = process_reviewer_com(
+                    file_path, reviewer, col_name, out_folder, self.log, excel_app, wb_source,
+                    layout=layout, keep_rows=member_rows(groups, members), source_filtered=source_filtered
+                )
+
+                if success and attachments:
+                    copy_q.put((attachments, r_folder))
+
+                with self.done_lock:
+                    self.done_count += 1
+                    # Queued under the lock so the bar never steps backwards
+                    self.set_progress(f"Processed: {reviewer} ({self.done_count}/{total})", self.done_count)
+                self._flush_log_file()
+        except Exception as e:
+            self.log(f"❌ Excel worker error: {e}")
+        finally:
+            if wb_source is not None:
+                try: wb_source.Close(False)
+                except: pass
+
     def run_process(self):
         file_path = self.file_path_var.get()
         col_name = self.col_name_var.get()
@@ -312,51 +452,85 @@ class App(tk.Tk):
         try:
             os.makedirs(log_dir, exist_ok=True)
             log_path = os.path.join(log_dir, f"aer-share-{today_str}.log")
-            self.log_file_handle = open(log_path, "a", encoding="utf-8")
+            self.log_file_handle = open(log_path, "a", encoding="utf-8", buffering=LOG_BUFFER_BYTES)
         except: pass
         
-        self.log("🚀 Starting Task (COM Mode)")
+        is_xlsx = os.path.splitext(file_path)[1].lower() == ".xlsx"
+        use_fast = is_xlsx and (self.fast_xlsx_var.get() or not WIN32COM_AVAILABLE)
+        self.log("🚀 Starting Task (Fast .xlsx Mode)" if use_fast else "🚀 Starting Task (COM Mode)")
         
         try:
             if not os.path.exists(file_path): return
+            if not use_fast and not WIN32COM_AVAILABLE:
+                self.log("❌ Windows Excel Required for non-.xlsx files.")
+                return
             
             # Read reviewers
-            df = pd.read_excel(file_path)
-            if col_name not in df.columns:
+            reviewers = read_unique_reviewers(file_path, col_name)
+            if reviewers is None:
                 self.log(f"❌ Column '{col_name}' not found.")
                 return
 
-            reviewers = df[col_name].dropna().unique().tolist()
-            total = len(reviewers)
+            # Reviewers sharing an output file are merged up front so no two workers write it
+            reviewer_groups = group_reviewers_by_output(reviewers)
+            for reviewer, members in reviewer_groups:
+                if len(members) > 1:
+                    self.log(f"⚠️ {', '.join(repr(m) for m in members)} share an output folder; merged into: {reviewer}")
+            total = len(reviewer_groups)
             
-            self.progress["maximum"] = total
-            self.progress["value"] = 0
-            pythoncom.CoInitialize()
+            self.set_progress(value=0, maximum=total)
+            self.done_count = 0
 
-            for i, reviewer in enumerate(reviewers):
-                self.lbl_progress.config(text=f"Processing: {reviewer} ({i+1}/{total})")
-                self.log(f"Processing: {reviewer}")
-                
-                success, r_folder = process_reviewer_com(file_path, reviewer, col_name, out_folder, self.log)
-
-                if success:
-                    base_dir = os.path.dirname(file_path)
-                    copy_selected_documents(base_dir, r_folder, self.log)
-                    copy_additional_files_list(self.extra_files, r_folder, self.log)
-                
-                self.progress["value"] = i + 1
+            # Source-folder Word/PDF files + extra files, collected once for the whole run
+            attachments = list_attachments(os.path.dirname(file_path), self.extra_files)
+            copy_q = queue.Queue()
+            copiers = [threading.Thread(target=self.copy_worker, args=(copy_q,), daemon=True) for _ in range(MAX_COPY_WORKERS)]
+            for t in copiers: t.start()
+
+            try:
+                if use_fast:
+                    results = split_xlsx_values(file_path, col_name, reviewer_groups, out_folder, self.log)
+                    for i, (reviewer, success, r_folder) in enumerate(results):
+                        if success and attachments:
+                            copy_q.put((attachments, r_folder))
+                        self.set_progress(f"Processed: {reviewer} ({i+1}/{total})", i + 1)
+                        self._flush_log_file()
+                        if self._closing.is_set(): break
+                else:
+                    # One warm hidden Excel per worker, all draining the same reviewer queue
+                    work_q = queue.Queue()
+                    for group in reviewer_groups: work_q.put(group)
+                    n_workers = max(1, min(MAX_EXCEL_WORKERS, total))
+                    self.run_on_excel_hosts(
+                        n_workers,
+                        lambda excel_app: self.excel_worker(excel_app, work_q, file_path, col_name, out_folder, total, attachments, copy_q)
+                    )
+            finally:
+                # Let queued attachment copies finish before the run counts as done
+                for _ in copiers: copy_q.put(None)
+                for t in copiers: t.join()
             
-            self.lbl_progress.config(text="Done!")
+            if self._closing.is_set():
+                self.log("⏹️ Stopped: window closed")
+                return
+            self.set_progress("Done!")
             self.log("🎉 Completed!")
             messagebox.showinfo("Done", "Processing Complete!")
 
         except Exception as e:
             self.log(f"❌ Error: {e}")
-            messagebox.showerror("Error", str(e))
+            if not self._closing.is_set():
+                messagebox.showerror("Error", str(e))
         finally:
-            if self.log_file_handle: self.log_file_handle.close()
-            cleanup_excel_com()
-            self.btn_run.config(state="normal")
+            with self._log_lock:
+                if self.log_file_handle:
+                    self.log_file_handle.close()
+                    self.log_file_handle = None
+            if self._closing.is_set():
+                self.join_excel_hosts()
+            self._running = False
+            if not self._closing.is_set():
+                self.btn_run.config(state="normal")
 
 if __name__ == "__main__":
     app = App()
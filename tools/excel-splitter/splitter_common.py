@@ -0,0 +1,335 @@
+"""
+Shared by excel-splitter-gui-hide.py and excel-splitter-gui-remove.py:
+file/column helpers, the warm hidden-Excel plumbing and the Tk log/close
+handling of both apps (SplitterAppMixin).
+"""
+import os
+import shutil
+import platform
+import threading
+import queue
+import time
+from functools import lru_cache
+
+import tkinter as tk
+from tkinter import messagebox
+
+# --- CONFIGURATION ---
+MAX_EXCEL_WORKERS = min(4, os.cpu_count() or 1)
+LOG_FLUSH_MS = 50
+LOG_DRAIN_MAX = 200
+EXCEL_SHUTDOWN_TIMEOUT_S = 10
+UNBUFFERED_COPY_MIN_BYTES = 64 * 1024 * 1024
+
+# Logic Imports (install with pip install -r requirements.txt; each App reports anything missing)
+MISSING_DEPENDENCY = None
+try:
+    import pandas as pd
+    from openpyxl import load_workbook
+except ImportError as e:
+    MISSING_DEPENDENCY = e
+
+# Windows COM Import
+WIN32COM_AVAILABLE = False
+if platform.system() == 'Windows':
+    try:
+        import win32com.client
+        import pythoncom
+        WIN32COM_AVAILABLE = True
+    except ImportError:
+        pass
+
+# Unbuffered copies for large files (optional; falls back to shutil.copy2)
+WIN32FILE_AVAILABLE = False
+if platform.system() == 'Windows':
+    try:
+        import win32file
+        WIN32FILE_AVAILABLE = True
+    except ImportError:
+        pass
+
+XL_CALCULATION_MANUAL = -4135
+XL_CALCULATION_AUTOMATIC = -4105
+COPY_FILE_NO_BUFFERING = 0x00001000
+# Excel type library (CLSID, LCID, major, minor); 1.9 is Excel 2016 and later
+EXCEL_TYPELIB = ("{00020813-0000-0000-C000-000000000046}", 0, 1, 9)
+_typelib_lock = threading.Lock()
+
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '/\\:*?"<>|#%'})
+
+# ==========================================
+# 1. Helper Functions
+# ==========================================
+
+@lru_cache(maxsize=1024)
+def sanitize_folder_name(name: str) -> str:
+    return str(name).strip().translate(_SANITIZE_TABLE)[:255].rstrip()
+
+@lru_cache(maxsize=None)
+def split_source_path(file_path):
+    """(abs_src, base, ext) of the source file, shared by every reviewer in a batch."""
+    base, ext = os.path.splitext(os.path.basename(file_path))
+    return os.path.abspath(file_path), base, ext
+
+def fast_copy(src, dst):
+    """
+    shutil.copy2, except that files of UNBUFFERED_COPY_MIN_BYTES or more go through
+    CopyFileEx with COPY_FILE_NO_BUFFERING on Windows (large sequential copies
+    skip the cache manager). Falls back to copy2 if that call fails.
+    """
+    if WIN32FILE_AVAILABLE:
+        try:
+            if os.path.getsize(src) >= UNBUFFERED_COPY_MIN_BYTES:
+                win32file.CopyFileEx(src, dst, None, None, False, COPY_FILE_NO_BUFFERING)
+                return
+        except Exception:
+            pass
+    shutil.copy2(src, dst)
+
+def find_header_column(header, column_name):
+    """1-based index of column_name in a header row (surrounding spaces ignored); 0 if missing."""
+    try:
+        return [str(h).strip() for h in header].index(str(column_name).strip()) + 1
+    except ValueError:
+        return 0
+
+def read_unique_reviewers(file_path, column_name):
+    """
+    Stream only the reviewer column of the first sheet and return its distinct
+    values, or None when the column is missing. .xlsx/.xlsm go through openpyxl
+    read_only; other formats (.xls/.xlsb) fall back to pandas.
+    """
+    if os.path.splitext(file_path)[1].lower() not in (".xlsx", ".xlsm"):
+        target = str(column_name).strip()
+        df = pd.read_excel(file_path, usecols=lambda c: str(c).strip() == target)
+        if df.shape[1] == 0: return None
+        return df.iloc[:, 0].dropna().unique().tolist()
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        col_idx = find_header_column(header, column_name)
+        if col_idx == 0: return None
+
+        seen = {}
+        for (val,) in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx, values_only=True):
+            if val is not None and val not in seen:
+                seen[val] = None
+        return list(seen)
+    finally:
+        wb.close()
+
+def group_reviewers_by_output(reviewers):
+    """
+    [(reviewer, members)] per output folder. Reviewers whose folder names only
+    differ by case or surrounding spaces ("Alice", " Alice", "alice") are the
+    same file on Windows, so they are merged under the first one seen.
+    """
+    groups = {}
+    for r in reviewers:
+        groups.setdefault(sanitize_folder_name(str(r)).casefold(), []).append(r)
+    return [(members[0], members) for members in groups.values()]
+
+# ==========================================
+# 2. Excel COM Logic
+# ==========================================
+
+def configure_excel_app(excel_app):
+    excel_app.Visible = False
+    excel_app.DisplayAlerts = False
+    excel_app.ScreenUpdating = False
+    excel_app.EnableEvents = False
+    excel_app.AskToUpdateLinks = False
+    excel_app.Interactive = False
+    # Some Excel builds refuse to set Calculation with no workbook open
+    try: excel_app.Calculation = XL_CALCULATION_MANUAL
+    except: pass
+    return excel_app
+
+def save_workbook(excel_app, save):
+    """
+    Save with Calculation switched back to automatic: Excel stores the current
+    calculation mode in the file, and the switch recalculates formulas after
+    the edits so the saved values are current.
+    """
+    try: excel_app.Calculation = XL_CALCULATION_AUTOMATIC
+    except: pass
+    try:
+        save()
+    finally:
+        try: excel_app.Calculation = XL_CALCULATION_MANUAL
+        except: pass
+
+@lru_cache(maxsize=1)
+def ensure_excel_typelib():
+    """
+    Once per process: generate (or reuse from gen_py) the early-bound wrapper for
+    the pinned Excel type library, so EnsureDispatch does not parse the type
+    library again. False when that version isn't registered or can't be built.
+    """
+    with _typelib_lock:
+        try: return win32com.client.gencache.EnsureModule(*EXCEL_TYPELIB) is not None
+        except Exception: return False
+
+def create_excel_app():
+    """
+    Start a dedicated hidden Excel process for one worker thread.
+    DispatchEx never attaches to a running excel.exe; the caller must have
+    called pythoncom.CoInitialize() on that thread.
+    Wrapped early-bound (makepy) when possible so calls skip the per-name DISPID
+    lookup; falls back to late binding if the gen_py cache can't be built.
+    """
+    ensure_excel_typelib()
+    excel_app = win32com.client.DispatchEx("Excel.Application")
+    try: excel_app = win32com.client.gencache.EnsureDispatch(excel_app)
+    except Exception: pass
+    return configure_excel_app(excel_app)
+
+def release_excel_app(excel_app):
+    if excel_app is None: return
+    try:
+        excel_app.Interactive = True
+        excel_app.Calculation = XL_CALCULATION_AUTOMATIC
+        excel_app.EnableEvents = True
+        excel_app.ScreenUpdating = True
+    except: pass
+    try:
+        excel_app.Quit()
+    except: pass
+
+def ensure_excel_app(excel_app):
+    """Reuse a warm Excel if it still responds; otherwise start a fresh one."""
+    if excel_app is not None:
+        try:
+            excel_app.Workbooks.Count
+            return excel_app
+        except Exception:
+            release_excel_app(excel_app)
+    return create_excel_app()
+
+def close_all_workbooks(excel_app):
+    """Close whatever a run left open, without saving, so the warm Excel starts the next run clean."""
+    if excel_app is None: return
+    try:
+        while excel_app.Workbooks.Count:
+            excel_app.Workbooks(1).Close(False)
+    except: pass
+
+def read_column_values(ws, col_idx, last_row):
+    """
+    Read rows 2..last_row of one column in a single Range.Value2 call
+    (Value2 skips the date/currency conversion Value does on every cell).
+    """
+    if last_row < 2: return ()
+    data = ws.Range(ws.Cells(2, col_idx), ws.Cells(last_row, col_idx)).Value2
+    if last_row == 2: return (data,)
+    return tuple(row[0] for row in data)
+
+def read_sheet_layout(ws, column_name):
+    """
+    (last_row, last_col, col_idx) of a sheet from UsedRange and one bulk header
+    read; col_idx is 0 when the column is missing.
+    """
+    last_row = ws.UsedRange.Rows.Count
+    last_col = ws.UsedRange.Columns.Count
+    header_row = ws.Range(ws.Cells(1, 1), ws.Cells(1, last_col)).Value
+    col_idx = find_header_column(header_row[0] if last_col > 1 else (header_row,), column_name)
+    return last_row, last_col, col_idx
+
+# ==========================================
+# 3. GUI Plumbing
+# ==========================================
+
+class SplitterAppMixin:
+    """
+    Log batching, warm Excel hosts and window close for the tk.Tk apps.
+    The App sets _log_q, _last_ts, _excel_hosts, _running, _closing and
+    log_area, and provides log(); the class attributes below hold its wording.
+    """
+    EXCEL_ERROR_LOG = "❌ Excel worker error: {}"
+    CLOSE_PROMPT = ("Run in progress", "A run is still in progress.\nStop after the current reviewer and quit?")
+
+    def _timestamp(self):
+        # Messages logged within the same second reuse the formatted string
+        now = int(time.time())
+        if now != self._last_ts[0]:
+            self._last_ts = (now, time.strftime("%H:%M:%S", time.localtime(now)))
+        return self._last_ts[1]
+
+    def _drain_log(self):
+        lines = []
+        try:
+            while len(lines) < LOG_DRAIN_MAX:
+                lines.append(self._log_q.get_nowait())
+        except queue.Empty:
+            pass
+        if lines:
+            self.log_area.config(state='normal')
+            self.log_area.insert(tk.END, "\n".join(lines) + "\n")
+            self.log_area.see(tk.END)
+            self.log_area.config(state='disabled')
+        self.after(LOG_FLUSH_MS, self._drain_log)
+
+    def _excel_host(self, task_q):
+        """
+        Long-lived thread owning one hidden Excel, so only the first run pays
+        Excel's start-up. Runs (func, done) jobs as func(excel_app); None quits.
+        """
+        pythoncom.CoInitialize()
+        excel_app = None
+        try:
+            while True:
+                job = task_q.get()
+                if job is None: break
+                func, done = job
+                try:
+                    excel_app = ensure_excel_app(excel_app)
+                    func(excel_app)
+                except Exception as e:
+                    self.log(self.EXCEL_ERROR_LOG.format(e))
+                finally:
+                    close_all_workbooks(excel_app)
+                    done.set()
+        finally:
+            release_excel_app(excel_app)
+            pythoncom.CoUninitialize()
+
+    def run_on_excel_hosts(self, n, func):
+        """Run func(excel_app) on n warm Excel hosts (started on first use) and wait for all of them."""
+        while len(self._excel_hosts) < n:
+            task_q = queue.Queue()
+            t = threading.Thread(target=self._excel_host, args=(task_q,), daemon=True)
+            t.start()
+            self._excel_hosts.append((t, task_q))
+        events = []
+        for _, task_q in self._excel_hosts[:n]:
+            done = threading.Event()
+            task_q.put((func, done))
+            events.append(done)
+        for done in events: done.wait()
+
+    def join_excel_hosts(self):
+        """
+        Called by a run that ends after the window was closed: the hosts are daemon
+        threads, so wait until they have read their quit sentinel and released Excel
+        (resent for hosts started after on_close; a host stops at the first None).
+        """
+        for _, task_q in self._excel_hosts: task_q.put(None)
+        for t, _ in self._excel_hosts: t.join()
+
+    def on_close(self):
+        if self._running and not messagebox.askyesno(*self.CLOSE_PROMPT):
+            return
+        # Stop handing out work and tell every warm Excel to quit; the wait is polled
+        # from the mainloop against one overall deadline, so the window never freezes
+        self._closing.set()
+        for _, task_q in self._excel_hosts: task_q.put(None)
+        self.withdraw()
+        self._destroy_when_hosts_exit(time.monotonic() + EXCEL_SHUTDOWN_TIMEOUT_S)
+
+    def _destroy_when_hosts_exit(self, deadline):
+        if time.monotonic() < deadline and any(t.is_alive() for t, _ in self._excel_hosts):
+            self.after(100, self._destroy_when_hosts_exit, deadline)
+            return
+        self.destroy()
@@ -0,0 +1,154 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from openpyxl.worksheet.table import Table
+
+
+TOOL_DIR = Path(__file__).resolve().parents[1]
+if str(TOOL_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOL_DIR))
+
+import splitter_common
+
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), TOOL_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+hide = load_script("excel-splitter-gui-hide")
+remove = load_script("excel-splitter-gui-remove")
+
+REVIEWERS = ["Alice", "Bob", "alice", 7.0, 7, " Bob ", None]
+
+
+def write_sheet(path, rows, table_ref=None):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(("ID", "Reviewer"))
+    for i, reviewer in enumerate(rows, start=1):
+        ws.append((i, reviewer))
+    if table_ref:
+        ws.add_table(Table(displayName="T1", ref=table_ref))
+    wb.save(path)
+
+
+def quiet(msg):
+    pass
+
+
+class DeleteRowRunsTests(unittest.TestCase):
+    def test_runs_are_coalesced_bottom_up(self):
+        # data rows 2..10; keep sheet rows 2, 3 and 7
+        runs = remove.delete_row_runs(np.array([0, 1, 5]), 10)
+        self.assertEqual(runs, [(8, 10), (4, 6)])
+
+    def test_all_rows_kept(self):
+        self.assertEqual(remove.delete_row_runs(np.arange(9), 10), [])
+
+    def test_no_rows_kept(self):
+        self.assertEqual(remove.delete_row_runs(np.empty(0, dtype=np.int64), 10), [(2, 10)])
+
+    def test_sheet_without_data_rows(self):
+        self.assertEqual(remove.delete_row_runs(np.empty(0, dtype=np.int64), 1), [])
+
+
+class ReviewerGroupingTests(unittest.TestCase):
+    def test_group_reviewer_rows_matches_numbers_and_case(self):
+        groups = remove.group_reviewer_rows(REVIEWERS)
+        self.assertEqual(groups["alice"].tolist(), [0, 2])
+        self.assertEqual(groups[7].tolist(), [3, 4])
+        self.assertEqual(groups["bob"].tolist(), [1])
+        self.assertEqual(groups[" bob "].tolist(), [5])
+
+    def test_member_rows_is_sorted_union(self):
+        groups = remove.group_reviewer_rows(REVIEWERS)
+        self.assertEqual(remove.member_rows(groups, ["Bob", " Bob "]).tolist(), [1, 5])
+        self.assertEqual(remove.member_rows(groups, ["Alice", "alice"]).tolist(), [0, 2])
+        self.assertEqual(remove.member_rows(groups, ["Nobody"]).tolist(), [])
+
+    def test_output_folders_differing_in_case_or_spaces_are_merged(self):
+        groups = splitter_common.group_reviewers_by_output(["Alice", "Bob", " Alice", "alice", " Bob "])
+        self.assertEqual(groups, [("Alice", ["Alice", " Alice", "alice"]), ("Bob", ["Bob", " Bob "])])
+
+    def test_sanitized_names_sharing_a_folder_are_merged(self):
+        groups = splitter_common.group_reviewers_by_output(["A/B", "A_B", "C"])
+        self.assertEqual(groups, [("A/B", ["A/B", "A_B"]), ("C", ["C"])])
+
+
+class SplitXlsxValuesTests(unittest.TestCase):
+    def test_rows_follow_reviewer_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src.xlsx")
+            write_sheet(src, REVIEWERS)
+            reviewers = splitter_common.read_unique_reviewers(src, "Reviewer")
+            groups = splitter_common.group_reviewers_by_output(reviewers)
+            results = list(remove.split_xlsx_values(src, "Reviewer", groups, tmp, quiet))
+            self.assertTrue(all(success for _, success, _ in results))
+
+            def ids(folder):
+                wb = load_workbook(os.path.join(tmp, folder, f"src - {folder}.xlsx"))
+                return [row[0] for row in wb.worksheets[0].iter_rows(min_row=2, values_only=True)]
+
+            self.assertEqual(ids("Alice"), [1, 3])
+            self.assertEqual(ids("Bob"), [2, 6])
+            self.assertEqual(ids("7"), [4, 5])
+
+
+class HideOpenpyxlTests(unittest.TestCase):
+    def run_hide(self, tmp, src, reuse_workbook):
+        reviewers, filter_keys = hide.discover_reviewers(src, "Reviewer")
+        wb = load_workbook(src) if reuse_workbook else None
+        for reviewer, members in splitter_common.group_reviewers_by_output(reviewers):
+            ok, _ = hide.process_reviewer_hide_openpyxl(
+                src, reviewer, "Reviewer", tmp, quiet, filter_keys=filter_keys, members=members, wb=wb
+            )
+            self.assertTrue(ok)
+
+    def visible_ids(self, path):
+        ws = load_workbook(path).worksheets[0]
+        return [ws.cell(r, 1).value for r in range(2, ws.max_row + 1) if not ws.row_dimensions[r].hidden]
+
+    def test_discover_reviewers_filter_keys(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src.xlsx")
+            write_sheet(src, REVIEWERS)
+            reviewers, filter_keys = hide.discover_reviewers(src, "Reviewer")
+            self.assertEqual(reviewers, ["Alice", "Bob", "alice", 7, " Bob "])
+            self.assertEqual(filter_keys, ["alice", "bob", "alice", "7", "7", "bob", "none"])
+
+    def test_numbers_and_case_with_a_shared_workbook(self):
+        for reuse_workbook in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                src = os.path.join(tmp, "src.xlsx")
+                write_sheet(src, REVIEWERS)
+                self.run_hide(tmp, src, reuse_workbook)
+                self.assertEqual(self.visible_ids(os.path.join(tmp, "Alice", "src - Alice.xlsx")), [1, 3])
+                self.assertEqual(self.visible_ids(os.path.join(tmp, "Bob", "src - Bob.xlsx")), [2, 6])
+                self.assertEqual(self.visible_ids(os.path.join(tmp, "7", "src - 7.xlsx")), [4, 5])
+
+                ws = load_workbook(os.path.join(tmp, "Alice", "src - Alice.xlsx")).worksheets[0]
+                self.assertEqual(ws.auto_filter.ref, "A1:B8")
+                self.assertEqual(ws.auto_filter.filterColumn[0].filters.filter, ["Alice", "alice"])
+
+    def test_table_gets_the_filter_instead_of_the_sheet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "src.xlsx")
+            write_sheet(src, REVIEWERS, table_ref="A1:B8")
+            self.run_hide(tmp, src, reuse_workbook=True)
+            ws = load_workbook(os.path.join(tmp, "Bob", "src - Bob.xlsx")).worksheets[0]
+            self.assertIsNone(ws.auto_filter.ref)
+            self.assertEqual(ws.tables["T1"].autoFilter.filterColumn[0].filters.filter, ["Bob"])
+            self.assertEqual(self.visible_ids(os.path.join(tmp, "Bob", "src - Bob.xlsx")), [2, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()